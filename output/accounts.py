@@ -1,3 +1,61 @@
+import os
+import pickle
+import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from math import isfinite, isnan
+from operator import index, mul
+from time import monotonic_ns as _monotonic_ns, time as _wall_time
+from types import MappingProxyType
+from typing import NamedTuple
+
+# Fixed demo prices, built once at import rather than on every lookup
+_PRICES = {
+    'AAPL': 150.0,
+    'TSLA': 250.0,
+    'GOOGL': 120.0
+}
+
+# Number of transactions between state snapshots used by calculate_profit_or_loss_at_time
+_SNAPSHOT_INTERVAL = 100
+
+# Most transaction records kept in memory per account, and how many are paged out to disk at a time
+_TRANSACTION_WINDOW = 10_000
+_PAGE_SIZE = 1_000
+
+# Transaction type codes, and their display names indexed by code
+DEPOSIT, WITHDRAW, BUY, SELL = 0, 1, 2, 3
+TYPE_NAMES = ("DEPOSIT", "WITHDRAW", "BUY", "SELL")
+
+# Direction each transaction type moves the share count, indexed by type code
+_SHARE_SIGN = (0, 0, 1, -1)
+
+
+class Transaction(NamedTuple):
+    """A single entry in an account's transaction log."""
+    
+    epoch: float
+    elapsed_us: int
+    type: int
+    amount: float
+    symbol: str | None = None
+    quantity: int | None = None
+    price: float | None = None
+    
+    @property
+    def timestamp(self):
+        """float: The UNIX timestamp of the transaction.
+        
+        This is the wall-clock time the account was opened plus the monotonic time elapsed since.
+        It does not follow wall-clock steps such as NTP corrections, or time the host spends
+        suspended, after the account was opened, so it can drift from time.time() over the
+        account's lifetime.
+        """
+        return self.epoch + self.elapsed_us / 1e6
+
+
 def get_share_price(symbol):
     """Returns the current price of a share for testing purposes.
     
@@ -8,20 +66,120 @@ def get_share_price(symbol):
         float: The current price of the share.
     """
     # This is a test implementation that returns fixed prices for common symbols
-    prices = {
-        'AAPL': 150.0,
-        'TSLA': 250.0,
-        'GOOGL': 120.0
-    }
-    if symbol in prices:
-        return prices[symbol]
-    else:
-        raise ValueError(f"Price for symbol '{symbol}' not available")
+    try:
+        return _PRICES[symbol]
+    except KeyError:
+        raise ValueError(f"Price for symbol '{symbol}' not available") from None
+
+
+def get_share_prices(symbols):
+    """Returns the current prices for several shares in one call.
+    
+    Args:
+        symbols (iterable): The stock symbols to get prices for.
+        
+    Returns:
+        dict: A dictionary with stock symbols as keys and prices as values.
+        
+    Raises:
+        ValueError: If a price is not available for any of the symbols.
+    """
+    return {symbol: get_share_price(symbol) for symbol in symbols}
+
+
+def get_available_prices():
+    """Returns the demo prices for every symbol that can be traded.
+    
+    Returns:
+        mappingproxy: A read-only view with stock symbols as keys and prices as values.
+    """
+    return MappingProxyType(_PRICES)
+
+
+def _whole_quantity(quantity):
+    """Check a share quantity is a positive whole number.
+    
+    Args:
+        quantity (int): The quantity of shares. Integral floats such as 2.0 are accepted.
+        
+    Returns:
+        int: The quantity as an int.
+        
+    Raises:
+        ValueError: If the quantity is not a whole number or is not positive.
+    """
+    if isinstance(quantity, float) and quantity.is_integer():
+        quantity = int(quantity)
+    try:
+        quantity = index(quantity)
+    except TypeError:
+        raise ValueError("Quantity must be a whole number") from None
+    if quantity <= 0:
+        raise ValueError("Quantity must be positive")
+    return quantity
+
+
+def _normalize_symbol(symbol):
+    """Upper-case, strip and intern a trade symbol so holdings lookups compare by identity.
+    
+    Args:
+        symbol (str): The stock symbol, in any case and possibly with surrounding spaces.
+        
+    Returns:
+        str: The normalized symbol.
+        
+    Raises:
+        ValueError: If the symbol is not a string.
+    """
+    if not isinstance(symbol, str):
+        raise ValueError("Symbol must be a string")
+    return sys.intern(symbol.upper().strip())
+
+
+def _net_shares_by_symbol(symbol_ids, share_changes, symbol_count):
+    """Sum signed share changes per symbol id, like a weighted bincount.
+    
+    Cash transactions have symbol id -1 and no share change, so they add 0 to a spare
+    slot at the end of the totals instead of needing a branch in the loop.
+    
+    Args:
+        symbol_ids (array): The symbol id of each transaction.
+        share_changes (array): The signed share change of each transaction.
+        symbol_count (int): The number of symbols in the account's symbol table.
+        
+    Returns:
+        list: The net share change for each symbol id, plus the spare slot.
+    """
+    totals = [0] * (symbol_count + 1)
+    for symbol_id, change in zip(symbol_ids, share_changes):
+        totals[symbol_id] += change
+    return totals
+
+
+def _portfolio_value_kernel(holdings, prices):
+    """Sum the market value of a set of holdings.
+    
+    Args:
+        holdings (dict): The number of shares held, keyed by stock symbol.
+        prices (dict): The price of each held symbol, keyed by stock symbol.
+        
+    Returns:
+        float: The total market value of the holdings.
+    """
+    # Prices are looked up by symbol, so they need not come back in the order of the holdings
+    return sum(map(mul, holdings.values(), map(prices.__getitem__, holdings)))
 
 
 class Account:
     """Represents a user's trading account for a trading simulation platform."""
     
+    __slots__ = (
+        'balance', 'initial_deposit', 'holdings', 'transactions', '_epoch', '_mono0',
+        '_rev', '_pv_cache', '_pv_rev', '_holding_values',
+        '_tx_timestamps', '_tx_balances', '_tx_symbol_ids', '_tx_shares', '_symbols', '_symbol_ids',
+        '_snapshots', '_history_file', '_page_offsets',
+    )
+    
     def __init__(self, initial_deposit):
         """Initialize a new account with an initial deposit.
         
@@ -36,40 +194,149 @@ class Account:
         
         self.balance = initial_deposit
         self.initial_deposit = initial_deposit
-        self.holdings = {}
+        self.holdings = Counter()
         self.transactions = []
         
+        # Wall-clock time and monotonic clock reading taken together when the account is opened.
+        # Transactions store whole microseconds elapsed on the monotonic clock since then, converted
+        # to wall-clock time on demand, so any drift is bounded by this account's lifetime.
+        self._epoch = _wall_time()
+        self._mono0 = _monotonic_ns()
+        
+        # Revision number, bumped on every change to the account
+        self._rev = 0
+        
+        # Cached portfolio value, the (price, value) of each holding behind it, and the revision they were computed at
+        self._pv_cache = None
+        self._holding_values = {}
+        self._pv_rev = -1
+        
+        # Struct-of-arrays copy of the full transaction log used for replays: elapsed time, cash balance
+        # after the transaction, symbol id (-1 for cash transactions) and signed share change.
+        # Unlike the transaction records, these are never paged out.
+        self._tx_timestamps = array('q')
+        self._tx_balances = array('d')
+        self._tx_symbol_ids = array('i')
+        self._tx_shares = array('q')
+        
+        # Symbol table for the symbol id column
+        self._symbols = []
+        self._symbol_ids = {}
+        
+        # (transaction index, holdings) snapshots taken every _SNAPSHOT_INTERVAL transactions
+        self._snapshots = []
+        
+        # Temporary file holding pickled pages of the oldest transactions, created on first use,
+        # and the byte offset of each page in it
+        self._history_file = None
+        self._page_offsets = array('q')
+        
         # Record the initial deposit as a transaction
-        self._record_transaction("DEPOSIT", initial_deposit)
+        self._record_transaction(DEPOSIT, initial_deposit, initial_deposit)
     
-    def _record_transaction(self, transaction_type, amount, symbol=None, quantity=None, price=None):
-        """Record a transaction in the transactions list.
+    def _record_transaction(self, transaction_type, amount, balance, symbol=None, quantity=None, price=None):
+        """Apply a transaction to the balance and holdings and record it in the transaction log.
+        
+        The record and its column entries are built before the balance and holdings change,
+        so a transaction that cannot be recorded leaves the account untouched.
         
         Args:
-            transaction_type (str): The type of transaction (DEPOSIT, WITHDRAW, BUY, SELL).
+            transaction_type (int): The type code of the transaction (DEPOSIT, WITHDRAW, BUY or SELL).
             amount (float): The amount involved in the transaction.
+            balance (float): The cash balance after the transaction.
             symbol (str, optional): The stock symbol for buy/sell transactions.
             quantity (int, optional): The quantity of shares for buy/sell transactions.
             price (float, optional): The price per share for buy/sell transactions.
+            
+        Returns:
+            Transaction: The recorded transaction.
         """
-        import time
+        elapsed_us = (_monotonic_ns() - self._mono0) // 1000
+        transaction = Transaction(self._epoch, elapsed_us, transaction_type, amount, symbol, quantity, price)
+        if symbol is None:
+            symbol_id, share_change = -1, 0
+        else:
+            symbol_id = self._symbol_ids.get(symbol, len(self._symbols))
+            share_change = _SHARE_SIGN[transaction_type] * quantity
+        
+        # The share column is the only one that can reject a value, so it goes first
+        self._tx_shares.append(share_change)
+        self._tx_timestamps.append(elapsed_us)
+        self._tx_balances.append(balance)
+        self._tx_symbol_ids.append(symbol_id)
+        if symbol_id == len(self._symbols):
+            self._symbol_ids[symbol] = symbol_id
+            self._symbols.append(symbol)
+        self.transactions.append(transaction)
         
-        transaction = {
-            'timestamp': time.time(),
-            'type': transaction_type,
-            'amount': amount
-        }
+        self.balance = balance
+        if share_change:
+            self.holdings[symbol] += share_change
+            # Remove the symbol from holdings once it is sold down to zero
+            if not self.holdings[symbol]:
+                del self.holdings[symbol]
         
-        if symbol is not None:
-            transaction['symbol'] = symbol
+        # Snapshot the state every few transactions so historical replays can start part-way through.
+        # The columns cover the whole history, whereas the record list loses its oldest pages to disk.
+        count = len(self._tx_timestamps)
+        if count % _SNAPSHOT_INTERVAL == 0:
+            self._snapshots.append((count, self.holdings.copy()))
         
-        if quantity is not None:
-            transaction['quantity'] = quantity
+        # Keep only the most recent transaction records in memory
+        if len(self.transactions) > _TRANSACTION_WINDOW:
+            self._page_out_transactions()
+        
+        # Every mutation records a transaction, so this is the one place to bump the revision
+        self._rev += 1
+        
+        return transaction
+    
+    @property
+    def revision(self):
+        """int: A number that changes whenever the account changes, for keying cached views of it."""
+        return self._rev
+    
+    def _page_out_transactions(self):
+        """Move the oldest page of in-memory transactions to the history file."""
+        if self._history_file is None:
+            self._history_file = tempfile.TemporaryFile()
+        
+        self._history_file.seek(0, os.SEEK_END)
+        self._page_offsets.append(self._history_file.tell())
+        pickle.dump(self.transactions[:_PAGE_SIZE], self._history_file)
+        del self.transactions[:_PAGE_SIZE]
+    
+    def _load_page(self, page):
+        """Read one page of transactions back from the history file.
+        
+        The file position is shared by every reader, so each page is read from its own recorded offset.
+        
+        Args:
+            page (int): The index of the page, oldest first.
             
-        if price is not None:
-            transaction['price'] = price
+        Returns:
+            list: The transactions on the page, oldest first.
+        """
+        self._history_file.seek(self._page_offsets[page])
+        return pickle.load(self._history_file)
+    
+    def __getstate__(self):
+        """Return the state for pickling and copying, with the paged-out transactions back in memory.
         
-        self.transactions.append(transaction)
+        The open history file cannot be pickled, so the copy starts without one and pages out afresh.
+        """
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state['transactions'] = self.list_transactions()
+        state['_history_file'] = None
+        state['_page_offsets'] = array('q')
+        return state
+    
+    def __setstate__(self, state):
+        """Restore the state returned by __getstate__."""
+        for name, value in state.items():
+            setattr(self, name, value)
+        while len(self.transactions) > _TRANSACTION_WINDOW:
+            self._page_out_transactions()
     
     def deposit(self, amount):
         """Deposit funds into the account.
@@ -83,8 +350,7 @@ class Account:
         if amount <= 0:
             raise ValueError("Deposit amount must be positive")
         
-        self.balance += amount
-        self._record_transaction("DEPOSIT", amount)
+        self._record_transaction(DEPOSIT, amount, self.balance + amount)
     
     def withdraw(self, amount):
         """Withdraw funds from the account.
@@ -101,21 +367,23 @@ class Account:
         if amount > self.balance:
             raise ValueError("Insufficient funds for withdrawal")
         
-        self.balance -= amount
-        self._record_transaction("WITHDRAW", amount)
+        self._record_transaction(WITHDRAW, amount, self.balance - amount)
     
     def buy_shares(self, symbol, quantity):
         """Buy shares of a specified stock.
         
         Args:
-            symbol (str): The stock symbol to buy.
-            quantity (int): The quantity of shares to buy.
+            symbol (str): The stock symbol to buy, in any case.
+            quantity (int): The whole number of shares to buy.
+            
+        Returns:
+            Transaction: The recorded purchase, including the price paid per share.
             
         Raises:
-            ValueError: If the quantity is not positive or if there are insufficient funds.
+            ValueError: If the symbol is not a string, the quantity is not a positive whole number or there are insufficient funds.
         """
-        if quantity <= 0:
-            raise ValueError("Quantity must be positive")
+        quantity = _whole_quantity(quantity)
+        symbol = _normalize_symbol(symbol)
         
         # Get the current price of the stock
         price = get_share_price(symbol)
@@ -127,33 +395,27 @@ class Account:
         if cost > self.balance:
             raise ValueError("Insufficient funds to buy shares")
         
-        # Update the balance
-        self.balance -= cost
-        
-        # Update the holdings
-        if symbol in self.holdings:
-            self.holdings[symbol] += quantity
-        else:
-            self.holdings[symbol] = quantity
-        
-        # Record the transaction
-        self._record_transaction("BUY", cost, symbol, quantity, price)
+        # Record the transaction, which also updates the balance and holdings
+        return self._record_transaction(BUY, cost, self.balance - cost, symbol, quantity, price)
     
     def sell_shares(self, symbol, quantity):
         """Sell shares of a specified stock.
         
         Args:
-            symbol (str): The stock symbol to sell.
-            quantity (int): The quantity of shares to sell.
+            symbol (str): The stock symbol to sell, in any case.
+            quantity (int): The whole number of shares to sell.
+            
+        Returns:
+            Transaction: The recorded sale, including the price received per share.
             
         Raises:
-            ValueError: If the quantity is not positive or if there are insufficient shares.
+            ValueError: If the symbol is not a string, the quantity is not a positive whole number or there are insufficient shares.
         """
-        if quantity <= 0:
-            raise ValueError("Quantity must be positive")
+        quantity = _whole_quantity(quantity)
+        symbol = _normalize_symbol(symbol)
         
-        # Check if the user has the shares
-        if symbol not in self.holdings or self.holdings[symbol] < quantity:
+        # Check if the user has the shares (a symbol that is not held counts as 0)
+        if self.holdings[symbol] < quantity:
             raise ValueError("Insufficient shares to sell")
         
         # Get the current price of the stock
@@ -162,34 +424,40 @@ class Account:
         # Calculate the total proceeds
         proceeds = price * quantity
         
-        # Update the balance
-        self.balance += proceeds
-        
-        # Update the holdings
-        self.holdings[symbol] -= quantity
-        
-        # Remove the symbol from holdings if the quantity is 0
-        if self.holdings[symbol] == 0:
-            del self.holdings[symbol]
-        
-        # Record the transaction
-        self._record_transaction("SELL", proceeds, symbol, quantity, price)
+        # Record the transaction, which also updates the balance and holdings
+        return self._record_transaction(SELL, proceeds, self.balance + proceeds, symbol, quantity, price)
     
     def calculate_portfolio_value(self):
         """Calculate the total value of the portfolio (cash + stock holdings).
         
+        The value is cached and only recomputed after a deposit, withdrawal or trade.
+        
         Returns:
             float: The total portfolio value.
         """
-        # Start with the cash balance
-        total_value = self.balance
+        if self._pv_rev == self._rev:
+            return self._pv_cache
+        
+        # Fetch every price up front, value each holding, then add the holdings to the cash balance
+        prices = get_share_prices(self.holdings)
+        self._holding_values = {
+            symbol: (prices[symbol], prices[symbol] * quantity) for symbol, quantity in self.holdings.items()
+        }
+        self._pv_cache = self.balance + _portfolio_value_kernel(self.holdings, prices)
+        self._pv_rev = self._rev
+        return self._pv_cache
+    
+    def mark_to_market(self):
+        """Revalue the portfolio at the current share prices.
         
-        # Add the value of all stock holdings
-        for symbol, quantity in self.holdings.items():
-            price = get_share_price(symbol)
-            total_value += price * quantity
+        Use this when prices have moved without any change to the account,
+        since the cached portfolio value is only refreshed on deposits, withdrawals and trades.
         
-        return total_value
+        Returns:
+            float: The total portfolio value at current prices.
+        """
+        self._pv_rev = -1
+        return self.calculate_portfolio_value()
     
     def calculate_profit_or_loss(self):
         """Calculate the profit or loss from the initial deposit.
@@ -203,17 +471,53 @@ class Account:
         """Get the current stock holdings.
         
         Returns:
-            dict: A dictionary with stock symbols as keys and quantities as values.
+            mappingproxy: A read-only view with stock symbols as keys and quantities as values.
+        """
+        return MappingProxyType(self.holdings)
+    
+    def list_holding_values(self):
+        """Get the current price and market value of each stock holding.
+        
+        These are worked out alongside the portfolio value and cached with it.
+        
+        Returns:
+            mappingproxy: A read-only view with stock symbols as keys and (price, value) tuples as values.
         """
-        return self.holdings.copy()
+        self.calculate_portfolio_value()
+        return MappingProxyType(self._holding_values)
     
     def list_transactions(self):
-        """Get a list of all transactions made.
+        """Get a list of all transactions made, including those paged out of memory.
         
         Returns:
             list: A list of all transactions.
         """
-        return self.transactions.copy()
+        paged = [transaction for page in range(len(self._page_offsets)) for transaction in self._load_page(page)]
+        return paged + self.transactions
+    
+    def iter_transactions(self):
+        """Iterate over all transactions made, including those paged out of memory, without copying the list.
+        
+        Several iterators can be live at once. Transactions recorded while iterating are included,
+        and records paged out part-way through are read back from disk rather than skipped.
+        
+        Yields:
+            Transaction: Every transaction, oldest first.
+        """
+        # Track positions in the full history, since page-outs shift the in-memory list under the iterator
+        position = page = page_start = 0
+        while True:
+            if page < len(self._page_offsets):
+                records = self._load_page(page)
+                start, page_start, page = page_start, page_start + len(records), page + 1
+                for transaction in records[position - start:]:
+                    yield transaction
+                    position += 1
+            elif position - page_start < len(self.transactions):
+                yield self.transactions[position - page_start]
+                position += 1
+            else:
+                return
     
     def calculate_profit_or_loss_at_time(self, timestamp):
         """Calculate the profit or loss at a specific point in time.
@@ -223,48 +527,44 @@ class Account:
             
         Returns:
             float: The profit (positive) or loss (negative) amount at the given time.
-        """
-        # Replay all transactions up to the given timestamp
-        balance = 0
-        holdings = {}
-        initial_deposit = None
-        
-        for transaction in self.transactions:
-            if transaction['timestamp'] > timestamp:
-                break
-            
-            if transaction['type'] == "DEPOSIT":
-                balance += transaction['amount']
-                if initial_deposit is None:  # The first deposit is the initial deposit
-                    initial_deposit = transaction['amount']
-            
-            elif transaction['type'] == "WITHDRAW":
-                balance -= transaction['amount']
             
-            elif transaction['type'] == "BUY":
-                balance -= transaction['amount']
-                symbol = transaction['symbol']
-                quantity = transaction['quantity']
-                
-                if symbol in holdings:
-                    holdings[symbol] += quantity
-                else:
-                    holdings[symbol] = quantity
-            
-            elif transaction['type'] == "SELL":
-                balance += transaction['amount']
-                symbol = transaction['symbol']
-                quantity = transaction['quantity']
-                
-                holdings[symbol] -= quantity
-                
-                if holdings[symbol] == 0:
-                    del holdings[symbol]
+        Raises:
+            ValueError: If the timestamp is NaN.
+        """
+        if isnan(timestamp):
+            raise ValueError("Timestamp must not be NaN")
+        
+        holdings = Counter()
+        start = 0
+        
+        # Round finite timestamps to the microsecond grid the log is stamped on; infinities
+        # stay floats and bisect to either end of the log
+        elapsed = (timestamp - self._epoch) * 1e6
+        if isfinite(elapsed):
+            elapsed = round(elapsed)
+        
+        # Transactions are recorded in time order, so everything before the cutoff happened by the given timestamp
+        cutoff = bisect_right(self._tx_timestamps, elapsed)
+        
+        # The cash balance is logged after every transaction, so it is a single lookup
+        balance = self._tx_balances[cutoff - 1] if cutoff else 0
+        
+        # Holdings resume from the latest snapshot within the cutoff, if any, and replay only the trades after it
+        snapshot_idx = cutoff // _SNAPSHOT_INTERVAL
+        if snapshot_idx:
+            start, snapshot_holdings = self._snapshots[snapshot_idx - 1]
+            holdings = snapshot_holdings.copy()
+        
+        net_shares = _net_shares_by_symbol(
+            self._tx_symbol_ids[start:cutoff], self._tx_shares[start:cutoff], len(self._symbols)
+        )
+        for symbol, shares in zip(self._symbols, net_shares):
+            if shares:
+                holdings[symbol] += shares
+        holdings = +holdings  # Drop symbols that were sold down to zero
         
         # Calculate the total value at the given time
-        total_value = balance
-        for symbol, quantity in holdings.items():
-            price = get_share_price(symbol)
-            total_value += price * quantity
+        prices = get_share_prices(holdings)
+        total_value = balance + _portfolio_value_kernel(holdings, prices)
         
-        return total_value - initial_deposit
\ No newline at end of file
+        return total_value - self.initial_deposit
\ No newline at end of file
@@ -1,10 +1,32 @@
+import asyncio
+import functools
 import gradio as gr
 import time
-from accounts import Account, get_share_price
+from accounts import Account, DEPOSIT, WITHDRAW, BUY, SELL, TYPE_NAMES, get_available_prices
 
 # Initialize a global account object with None
 current_account = None
 
+# Last rendered account info and transaction history, as (account, revision, text)
+_info_cache = (None, -1, None)
+_history_cache = (None, -1, None)
+
+# Every session shares the one account, so its handlers take turns holding this lock
+_account_lock = asyncio.Lock()
+
+def _serialized(handler):
+    """Run a handler on a worker thread while holding the account lock.
+    
+    Gradio awaits the returned coroutine on its event loop. Rendering a long history or reading
+    paged transactions back from disk therefore blocks only other account events, not the loop.
+    """
+    @functools.wraps(handler)
+    async def run(*args):
+        async with _account_lock:
+            return await asyncio.to_thread(handler, *args)
+    return run
+
+@_serialized
 def create_account(initial_deposit):
     global current_account
     try:
@@ -14,6 +36,7 @@ def create_account(initial_deposit):
     except ValueError as e:
         return f"Error: {str(e)}", ""
 
+@_serialized
 def deposit_funds(amount):
     if not current_account:
         return "Error: No account exists. Create an account first.", ""
@@ -25,6 +48,7 @@ def deposit_funds(amount):
     except ValueError as e:
         return f"Error: {str(e)}", get_account_info()
 
+@_serialized
 def withdraw_funds(amount):
     if not current_account:
         return "Error: No account exists. Create an account first.", ""
@@ -36,39 +60,43 @@ def withdraw_funds(amount):
     except ValueError as e:
         return f"Error: {str(e)}", get_account_info()
 
+@_serialized
 def buy_shares(symbol, quantity):
     if not current_account:
         return "Error: No account exists. Create an account first.", ""
     
     try:
-        symbol = symbol.upper().strip()
         quantity = int(quantity)
-        current_price = get_share_price(symbol)
-        current_account.buy_shares(symbol, quantity)
-        return f"Successfully bought {quantity} shares of {symbol} at ${current_price:.2f} per share", get_account_info()
+        transaction = current_account.buy_shares(symbol, quantity)
+        return f"Successfully bought {quantity} shares of {transaction.symbol} at ${transaction.price:.2f} per share", get_account_info()
     except ValueError as e:
         return f"Error: {str(e)}", get_account_info()
 
+@_serialized
 def sell_shares(symbol, quantity):
     if not current_account:
         return "Error: No account exists. Create an account first.", ""
     
     try:
-        symbol = symbol.upper().strip()
         quantity = int(quantity)
-        current_price = get_share_price(symbol)
-        current_account.sell_shares(symbol, quantity)
-        return f"Successfully sold {quantity} shares of {symbol} at ${current_price:.2f} per share", get_account_info()
+        transaction = current_account.sell_shares(symbol, quantity)
+        return f"Successfully sold {quantity} shares of {transaction.symbol} at ${transaction.price:.2f} per share", get_account_info()
     except ValueError as e:
         return f"Error: {str(e)}", get_account_info()
 
 def get_account_info():
+    global _info_cache
     if not current_account:
         return "No account exists. Create an account first."
     
+    # Nothing to re-render if the account has not changed since the last call
+    if _info_cache[0] is current_account and _info_cache[1] == current_account.revision:
+        return _info_cache[2]
+    
     portfolio_value = current_account.calculate_portfolio_value()
     profit_or_loss = current_account.calculate_profit_or_loss()
     holdings = current_account.list_holdings()
+    holding_values = current_account.list_holding_values()
     
     info = f"Account Summary\n"
     info += f"--------------\n"
@@ -85,48 +113,60 @@ def get_account_info():
     
     if holdings:
         for symbol, quantity in holdings.items():
-            price = get_share_price(symbol)
-            value = price * quantity
+            price, value = holding_values[symbol]
             info += f"{symbol}: {quantity} shares at ${price:.2f} = ${value:.2f}\n"
     else:
         info += "No stock holdings.\n"
     
+    _info_cache = (current_account, current_account.revision, info)
     return info
 
+@_serialized
+def refresh_account_info():
+    return get_account_info()
+
+# Formatters for the body of each transaction history line, keyed by transaction type
+_TRANSACTION_FORMATS = {
+    DEPOSIT: lambda t: f"${t.amount:.2f}",
+    WITHDRAW: lambda t: f"${t.amount:.2f}",
+    BUY: lambda t: f"{t.quantity} shares of {t.symbol} at ${t.price:.2f} (Total: ${t.amount:.2f})",
+    SELL: lambda t: f"{t.quantity} shares of {t.symbol} at ${t.price:.2f} (Total: ${t.amount:.2f})",
+}
+
+@_serialized
 def get_transactions_list():
+    global _history_cache
     if not current_account:
         return "No account exists. Create an account first."
     
-    transactions = current_account.list_transactions()
+    if _history_cache[0] is current_account and _history_cache[1] == current_account.revision:
+        return _history_cache[2]
     
-    if not transactions:
+    if not current_account.transactions:
         return "No transactions found."
     
-    info = "Transaction History\n"
-    info += "------------------\n"
-    
-    for transaction in transactions:
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(transaction['timestamp']))
-        
-        if transaction['type'] == "DEPOSIT":
-            info += f"{timestamp} - DEPOSIT: ${transaction['amount']:.2f}\n"
-        
-        elif transaction['type'] == "WITHDRAW":
-            info += f"{timestamp} - WITHDRAW: ${transaction['amount']:.2f}\n"
-        
-        elif transaction['type'] == "BUY":
-            info += f"{timestamp} - BUY: {transaction['quantity']} shares of {transaction['symbol']} at ${transaction['price']:.2f} (Total: ${transaction['amount']:.2f})\n"
-        
-        elif transaction['type'] == "SELL":
-            info += f"{timestamp} - SELL: {transaction['quantity']} shares of {transaction['symbol']} at ${transaction['price']:.2f} (Total: ${transaction['amount']:.2f})\n"
+    lines = ["Transaction History", "------------------"]
     
-    return info
+    # Transactions often land in the same second, so each distinct second is formatted once
+    stamps = {}
+    for transaction in current_account.iter_transactions():
+        second = int(transaction.timestamp)
+        timestamp = stamps.get(second)
+        if timestamp is None:
+            timestamp = stamps[second] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        lines.append(f"{timestamp} - {TYPE_NAMES[transaction.type]}: {_TRANSACTION_FORMATS[transaction.type](transaction)}")
+    
+    history = "\n".join(lines) + "\n"
+    _history_cache = (current_account, current_account.revision, history)
+    return history
+
+# The demo prices never change, so the stock list is rendered once at import
+_AVAILABLE_STOCKS_TEXT = "Available Stocks for Demo:\n" + "\n".join(
+    f"- {symbol} (${price:.2f})" for symbol, price in get_available_prices().items()
+)
 
 def get_available_stocks():
-    return """Available Stocks for Demo:
-- AAPL ($150.00)
-- TSLA ($250.00)
-- GOOGL ($120.00)"""
+    return _AVAILABLE_STOCKS_TEXT
 
 with gr.Blocks(title="Trading Simulation Platform") as app:
     gr.Markdown("# Trading Simulation Platform")
@@ -198,7 +238,7 @@ with gr.Blocks(title="Trading Simulation Platform") as app:
     )
     
     refresh_button.click(
-        lambda: (get_account_info()),
+        refresh_account_info,
         inputs=None,
         outputs=account_info
     )
@@ -223,5 +263,8 @@ with gr.Blocks(title="Trading Simulation Platform") as app:
         outputs=transactions_output
     )
 
+# Up to 8 events are taken off the queue at once; account events then wait on _account_lock in turn
+app.queue(default_concurrency_limit=8)
+
 if __name__ == "__main__":
     app.launch()
\ No newline at end of file
@@ -0,0 +1,28 @@
+import pytest
+
+import accounts
+
+def _default_price(symbol):
+    """Price every symbol at 150.0."""
+    return 150.0
+
+@pytest.fixture
+def set_price(monkeypatch):
+    """Replace accounts.get_share_price for the rest of the test.
+    
+    Returns a setter that takes a price to return for every symbol, or a function
+    mapping a symbol to its price. Calling it again replaces the earlier price.
+    """
+    def set_price(value_or_fn):
+        price = value_or_fn if callable(value_or_fn) else lambda symbol: value_or_fn
+        monkeypatch.setattr(accounts, 'get_share_price', price)
+    return set_price
+
+@pytest.fixture
+def default_price(set_price):
+    """Price every symbol at 150.0 unless a test sets its own price.
+    
+    The same plain function is installed for every test, so no mock is built or reset per test.
+    """
+    set_price(_default_price)
+    return _default_price
@@ -1,354 +1,493 @@
-import unittest
-from unittest.mock import patch
+import copy
+import itertools
+import pickle
 import time
 
+import pytest
+
 # Import the module to test
 import accounts
+from accounts import Account
 
-class TestGetSharePrice(unittest.TestCase):
-    def test_get_share_price_existing(self):
-        """Test get_share_price with existing symbols."""
-        self.assertEqual(accounts.get_share_price('AAPL'), 150.0)
-        self.assertEqual(accounts.get_share_price('TSLA'), 250.0)
-        self.assertEqual(accounts.get_share_price('GOOGL'), 120.0)
-    
-    def test_get_share_price_non_existing(self):
-        """Test get_share_price with non-existing symbol raises ValueError."""
-        with self.assertRaises(ValueError):
-            accounts.get_share_price('MSFT')
-
-class TestAccountInitialization(unittest.TestCase):
-    def test_init_positive_deposit(self):
-        """Test Account initialization with positive deposit."""
-        account = accounts.Account(1000.0)
-        self.assertEqual(account.balance, 1000.0)
-        self.assertEqual(account.initial_deposit, 1000.0)
-        self.assertEqual(account.holdings, {})
-        self.assertEqual(len(account.transactions), 1)
-        self.assertEqual(account.transactions[0]['type'], 'DEPOSIT')
-        self.assertEqual(account.transactions[0]['amount'], 1000.0)
-    
-    def test_init_zero_deposit(self):
-        """Test Account initialization with zero deposit raises ValueError."""
-        with self.assertRaises(ValueError):
-            accounts.Account(0)
-    
-    def test_init_negative_deposit(self):
-        """Test Account initialization with negative deposit raises ValueError."""
-        with self.assertRaises(ValueError):
-            accounts.Account(-100.0)
-
-class TestAccountDeposit(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-    
-    def test_deposit_positive(self):
-        """Test deposit with positive amount."""
-        self.account.deposit(500.0)
-        self.assertEqual(self.account.balance, 1500.0)
-        self.assertEqual(len(self.account.transactions), 2)
-        self.assertEqual(self.account.transactions[-1]['type'], 'DEPOSIT')
-        self.assertEqual(self.account.transactions[-1]['amount'], 500.0)
-    
-    def test_deposit_zero(self):
-        """Test deposit with zero amount raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.account.deposit(0)
-    
-    def test_deposit_negative(self):
-        """Test deposit with negative amount raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.account.deposit(-100.0)
-
-class TestAccountWithdraw(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-    
-    def test_withdraw_positive_sufficient(self):
-        """Test withdraw with positive amount and sufficient balance."""
-        self.account.withdraw(300.0)
-        self.assertEqual(self.account.balance, 700.0)
-        self.assertEqual(len(self.account.transactions), 2)
-        self.assertEqual(self.account.transactions[-1]['type'], 'WITHDRAW')
-        self.assertEqual(self.account.transactions[-1]['amount'], 300.0)
-    
-    def test_withdraw_zero(self):
-        """Test withdraw with zero amount raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.account.withdraw(0)
-    
-    def test_withdraw_negative(self):
-        """Test withdraw with negative amount raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.account.withdraw(-100.0)
-    
-    def test_withdraw_insufficient(self):
-        """Test withdraw with insufficient balance raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.account.withdraw(1500.0)
-
-class TestAccountBuyShares(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-    
-    @patch('accounts.get_share_price')
-    def test_buy_shares_positive_sufficient(self, mock_get_price):
-        """Test buy_shares with positive quantity and sufficient funds."""
-        mock_get_price.return_value = 150.0  # AAPL price
-        self.account.buy_shares('AAPL', 2)
-        self.assertEqual(self.account.balance, 1000.0 - (150.0 * 2))  # 700.0
-        self.assertEqual(self.account.holdings, {'AAPL': 2})
-        self.assertEqual(len(self.account.transactions), 2)
-        self.assertEqual(self.account.transactions[-1]['type'], 'BUY')
-        self.assertEqual(self.account.transactions[-1]['amount'], 300.0)
-        self.assertEqual(self.account.transactions[-1]['symbol'], 'AAPL')
-        self.assertEqual(self.account.transactions[-1]['quantity'], 2)
-        self.assertEqual(self.account.transactions[-1]['price'], 150.0)
-    
-    @patch('accounts.get_share_price')
-    def test_buy_shares_zero_quantity(self, mock_get_price):
-        """Test buy_shares with zero quantity raises ValueError."""
-        mock_get_price.return_value = 150.0
-        with self.assertRaises(ValueError):
-            self.account.buy_shares('AAPL', 0)
-    
-    @patch('accounts.get_share_price')
-    def test_buy_shares_negative_quantity(self, mock_get_price):
-        """Test buy_shares with negative quantity raises ValueError."""
-        mock_get_price.return_value = 150.0
-        with self.assertRaises(ValueError):
-            self.account.buy_shares('AAPL', -1)
-    
-    @patch('accounts.get_share_price')
-    def test_buy_shares_insufficient_funds(self, mock_get_price):
-        """Test buy_shares with insufficient funds raises ValueError."""
-        mock_get_price.return_value = 150.0
-        with self.assertRaises(ValueError):
-            self.account.buy_shares('AAPL', 10)  # Cost 1500 > balance 1000
-    
-    @patch('accounts.get_share_price')
-    def test_buy_shares_multiple_symbols(self, mock_get_price):
-        """Test buying shares of multiple symbols."""
-        def side_effect(symbol):
-            if symbol == 'AAPL':
-                return 150.0
-            elif symbol == 'TSLA':
-                return 250.0
-        mock_get_price.side_effect = side_effect
-        self.account.buy_shares('AAPL', 2)  # Cost 300
-        self.account.buy_shares('TSLA', 1)  # Cost 250
-        self.assertEqual(self.account.balance, 1000.0 - 300.0 - 250.0)  # 450.0
-        self.assertEqual(self.account.holdings, {'AAPL': 2, 'TSLA': 1})
-    
-    @patch('accounts.get_share_price')
-    def test_buy_shares_existing_symbol(self, mock_get_price):
-        """Test buying additional shares of an existing symbol."""
-        mock_get_price.return_value = 150.0
-        self.account.buy_shares('AAPL', 2)
-        self.account.buy_shares('AAPL', 1)
-        self.assertEqual(self.account.holdings, {'AAPL': 3})
-
-class TestAccountSellShares(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-        # Pre-buy some shares for selling tests
-        with patch('accounts.get_share_price', return_value=150.0):
-            self.account.buy_shares('AAPL', 5)  # Cost 750, balance 250
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_positive_sufficient(self, mock_get_price):
-        """Test sell_shares with positive quantity and sufficient shares."""
-        mock_get_price.return_value = 150.0
-        self.account.sell_shares('AAPL', 2)
-        self.assertEqual(self.account.balance, 250.0 + (150.0 * 2))  # 550.0
-        self.assertEqual(self.account.holdings, {'AAPL': 3})
-        self.assertEqual(len(self.account.transactions), 3)  # Initial deposit, buy, sell
-        self.assertEqual(self.account.transactions[-1]['type'], 'SELL')
-        self.assertEqual(self.account.transactions[-1]['amount'], 300.0)
-        self.assertEqual(self.account.transactions[-1]['symbol'], 'AAPL')
-        self.assertEqual(self.account.transactions[-1]['quantity'], 2)
-        self.assertEqual(self.account.transactions[-1]['price'], 150.0)
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_zero_quantity(self, mock_get_price):
-        """Test sell_shares with zero quantity raises ValueError."""
-        mock_get_price.return_value = 150.0
-        with self.assertRaises(ValueError):
-            self.account.sell_shares('AAPL', 0)
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_negative_quantity(self, mock_get_price):
-        """Test sell_shares with negative quantity raises ValueError."""
-        mock_get_price.return_value = 150.0
-        with self.assertRaises(ValueError):
-            self.account.sell_shares('AAPL', -1)
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_insufficient_shares(self, mock_get_price):
-        """Test sell_shares with insufficient shares raises ValueError."""
-        mock_get_price.return_value = 150.0
-        with self.assertRaises(ValueError):
-            self.account.sell_shares('AAPL', 10)  # Only have 5
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_nonexistent_symbol(self, mock_get_price):
-        """Test sell_shares with symbol not in holdings raises ValueError."""
-        mock_get_price.return_value = 250.0
-        with self.assertRaises(ValueError):
-            self.account.sell_shares('TSLA', 1)
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_all_shares(self, mock_get_price):
-        """Test selling all shares removes symbol from holdings."""
-        mock_get_price.return_value = 150.0
-        self.account.sell_shares('AAPL', 5)
-        self.assertEqual(self.account.balance, 1000.0)  # Back to initial
-        self.assertEqual(self.account.holdings, {})
-    
-    @patch('accounts.get_share_price')
-    def test_sell_shares_multiple_symbols(self, mock_get_price):
-        """Test selling shares from multiple symbols."""
-        # Reset account with more balance
-        self.account = accounts.Account(2000.0)
-        # Buy AAPL and TSLA
-        with patch('accounts.get_share_price', side_effect=lambda s: 150.0 if s == 'AAPL' else 250.0):
-            self.account.buy_shares('AAPL', 5)  # Cost 750
-            self.account.buy_shares('TSLA', 2)  # Cost 500
-        # Now sell some
-        mock_get_price.side_effect = lambda s: 150.0 if s == 'AAPL' else 250.0
-        self.account.sell_shares('AAPL', 2)
-        self.account.sell_shares('TSLA', 1)
-        self.assertEqual(self.account.holdings, {'AAPL': 3, 'TSLA': 1})
-
-class TestAccountPortfolioValue(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_portfolio_value_cash_only(self, mock_get_price):
-        """Test portfolio value with only cash."""
-        mock_get_price.return_value = 150.0
-        self.assertEqual(self.account.calculate_portfolio_value(), 1000.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_portfolio_value_with_holdings(self, mock_get_price):
-        """Test portfolio value with cash and holdings."""
-        def side_effect(symbol):
-            if symbol == 'AAPL':
-                return 150.0
-            elif symbol == 'TSLA':
-                return 250.0
-        mock_get_price.side_effect = side_effect
-        with patch('accounts.get_share_price', side_effect=side_effect):
-            self.account.buy_shares('AAPL', 2)  # Cost 300, balance 700
-            self.account.buy_shares('TSLA', 1)  # Cost 250, balance 450
-        # Portfolio value = cash 450 + AAPL 2*150=300 + TSLA 1*250=250 = 1000
-        self.assertEqual(self.account.calculate_portfolio_value(), 1000.0)
-
-class TestAccountProfitOrLoss(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_profit_or_loss_no_trades(self, mock_get_price):
-        """Test profit/loss with no trades (should be zero)."""
-        mock_get_price.return_value = 150.0
-        self.assertEqual(self.account.calculate_profit_or_loss(), 0.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_profit_or_loss_profit(self, mock_get_price):
-        """Test profit/loss with profit scenario."""
-        # Simulate buying low, price increases
-        mock_get_price.return_value = 100.0  # Lower price for buying
-        self.account.buy_shares('AAPL', 5)  # Cost 500, balance 500
-        mock_get_price.return_value = 150.0  # Price increases for valuation
-        # Portfolio value = cash 500 + holdings 5*150=750 = 1250
-        # Profit = 1250 - 1000 = 250
-        self.assertEqual(self.account.calculate_profit_or_loss(), 250.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_profit_or_loss_loss(self, mock_get_price):
-        """Test profit/loss with loss scenario."""
-        # Simulate buying high, price decreases
-        mock_get_price.return_value = 200.0  # Higher price for buying
-        self.account.buy_shares('AAPL', 5)  # Cost 1000, balance 0
-        mock_get_price.return_value = 150.0  # Price decreases for valuation
-        # Portfolio value = cash 0 + holdings 5*150=750 = 750
-        # Profit = 750 - 1000 = -250 (loss)
-        self.assertEqual(self.account.calculate_profit_or_loss(), -250.0)
-
-class TestAccountListMethods(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-    
-    @patch('accounts.get_share_price')
-    def test_list_holdings(self, mock_get_price):
-        """Test list_holdings returns a copy."""
-        mock_get_price.return_value = 150.0
-        self.account.buy_shares('AAPL', 2)
-        holdings = self.account.list_holdings()
-        self.assertEqual(holdings, {'AAPL': 2})
-        # Modify the copy, original should not change
+# Prices for tests that trade more than one symbol
+MIXED_PRICES = {'AAPL': 150.0, 'TSLA': 250.0}
+
+@pytest.fixture
+def account():
+    """A fresh account with a 1000.0 initial deposit."""
+    return Account(1000.0)
+
+@pytest.fixture(scope="module")
+def shared_account():
+    """An account shared by tests that only read it or expect a ValueError."""
+    return Account(1000.0)
+
+@pytest.fixture(scope="module")
+def account_with_shares():
+    """An account holding 5 AAPL, shared by tests that only expect a ValueError."""
+    account = Account(1000.0)
+    account.buy_shares('AAPL', 5)  # Cost 750 at the demo price, balance 250
+    return account
+
+# get_share_price
+
+def test_get_share_price_existing():
+    """Test get_share_price with existing symbols."""
+    assert accounts.get_share_price('AAPL') == 150.0
+    assert accounts.get_share_price('TSLA') == 250.0
+    assert accounts.get_share_price('GOOGL') == 120.0
+
+def test_get_share_price_non_existing():
+    """Test get_share_price with non-existing symbol raises ValueError."""
+    with pytest.raises(ValueError):
+        accounts.get_share_price('MSFT')
+
+def test_get_available_prices():
+    """Test get_available_prices lists every demo symbol with its price, read-only."""
+    prices = accounts.get_available_prices()
+    assert prices == {'AAPL': 150.0, 'TSLA': 250.0, 'GOOGL': 120.0}
+    with pytest.raises(TypeError):
+        prices['MSFT'] = 100.0
+
+# Account initialization
+
+def test_init_positive_deposit():
+    """Test Account initialization with positive deposit."""
+    account = Account(1000.0)
+    assert account.balance == 1000.0
+    assert account.initial_deposit == 1000.0
+    assert not account.holdings
+    assert len(account.transactions) == 1
+    assert account.transactions[0].type == accounts.DEPOSIT
+    assert account.transactions[0].amount == 1000.0
+
+def test_init_zero_deposit():
+    """Test Account initialization with zero deposit raises ValueError."""
+    with pytest.raises(ValueError):
+        Account(0)
+
+def test_init_negative_deposit():
+    """Test Account initialization with negative deposit raises ValueError."""
+    with pytest.raises(ValueError):
+        Account(-100.0)
+
+# Deposit
+
+def test_deposit_positive(account):
+    """Test deposit with positive amount."""
+    account.deposit(500.0)
+    assert account.balance == 1500.0
+    assert len(account.transactions) == 2
+    assert account.transactions[-1].type == accounts.DEPOSIT
+    assert account.transactions[-1].amount == 500.0
+
+def test_deposit_changes_revision(account):
+    """Test deposit changes the account revision and reads do not."""
+    revision = account.revision
+    account.calculate_portfolio_value()
+    assert account.revision == revision
+    account.deposit(500.0)
+    assert account.revision != revision
+
+@pytest.mark.parametrize("bad_amount", [0, -100.0])
+def test_deposit_rejects_nonpositive(shared_account, bad_amount):
+    """Test deposit with zero or negative amount raises ValueError."""
+    with pytest.raises(ValueError):
+        shared_account.deposit(bad_amount)
+
+# Withdraw
+
+def test_withdraw_positive_sufficient(account):
+    """Test withdraw with positive amount and sufficient balance."""
+    account.withdraw(300.0)
+    assert account.balance == 700.0
+    assert len(account.transactions) == 2
+    assert account.transactions[-1].type == accounts.WITHDRAW
+    assert account.transactions[-1].amount == 300.0
+
+@pytest.mark.parametrize("bad_amount", [
+    0,
+    -100.0,
+    1500.0,  # More than the balance
+])
+def test_withdraw_rejects_invalid_amount(shared_account, bad_amount):
+    """Test withdraw with zero, negative or insufficient amount raises ValueError."""
+    with pytest.raises(ValueError):
+        shared_account.withdraw(bad_amount)
+
+# Buy shares
+
+def test_buy_shares_positive_sufficient(account, default_price):
+    """Test buy_shares with positive quantity and sufficient funds."""
+    transaction = account.buy_shares('AAPL', 2)
+    assert account.balance == 1000.0 - (150.0 * 2)  # 700.0
+    assert account.holdings['AAPL'] == 2
+    assert len(account.holdings) == 1
+    assert len(account.transactions) == 2
+    assert account.transactions[-1].type == accounts.BUY
+    assert account.transactions[-1].amount == 300.0
+    assert account.transactions[-1].symbol == 'AAPL'
+    assert account.transactions[-1].quantity == 2
+    assert account.transactions[-1].price == 150.0
+    assert transaction is account.transactions[-1]
+
+def test_buy_shares_multiple_symbols(account, set_price):
+    """Test buying shares of multiple symbols."""
+    set_price(MIXED_PRICES.__getitem__)
+    account.buy_shares('AAPL', 2)  # Cost 300
+    account.buy_shares('TSLA', 1)  # Cost 250
+    assert account.balance == 1000.0 - 300.0 - 250.0  # 450.0
+    assert account.holdings == {'AAPL': 2, 'TSLA': 1}
+
+def test_buy_shares_existing_symbol(account, default_price):
+    """Test buying additional shares of an existing symbol."""
+    account.buy_shares('AAPL', 2)
+    account.buy_shares('AAPL', 1)
+    assert account.holdings['AAPL'] == 3
+    assert len(account.holdings) == 1
+
+def test_buy_shares_normalizes_symbol(account, set_price):
+    """Test buy_shares accepts symbols in any case and with surrounding spaces."""
+    looked_up = []
+    def price(symbol):
+        looked_up.append(symbol)
+        return 150.0
+    set_price(price)
+    account.buy_shares(' aapl ', 2)
+    assert account.holdings['AAPL'] == 2
+    assert len(account.holdings) == 1
+    assert looked_up == ['AAPL']
+
+@pytest.mark.parametrize("trade", ['buy_shares', 'sell_shares'])
+@pytest.mark.parametrize("bad_symbol", [None, 123])
+def test_trade_rejects_non_string_symbol(shared_account, trade, bad_symbol):
+    """Test buy_shares and sell_shares with a non-string symbol raise ValueError."""
+    with pytest.raises(ValueError):
+        getattr(shared_account, trade)(bad_symbol, 1)
+
+@pytest.mark.parametrize("bad_quantity", [
+    0,
+    -1,
+    10,  # Cost 1500 > balance 1000
+])
+def test_buy_shares_rejects_invalid_quantity(shared_account, bad_quantity, set_price):
+    """Test buy_shares with zero, negative or unaffordable quantity raises ValueError."""
+    set_price(150.0)
+    with pytest.raises(ValueError):
+        shared_account.buy_shares('AAPL', bad_quantity)
+
+def test_buy_shares_fractional_quantity_leaves_account_unchanged(account, default_price):
+    """Test a fractional quantity raises ValueError before the balance, holdings or log change."""
+    with pytest.raises(ValueError):
+        account.buy_shares('AAPL', 1.5)
+    assert account.balance == 1000.0
+    assert not account.holdings
+    assert len(account.transactions) == 1
+    assert account.calculate_profit_or_loss_at_time(float('inf')) == 0.0
+
+def test_buy_shares_whole_float_quantity(account, default_price):
+    """Test a whole-number float quantity is accepted and stored as an int."""
+    transaction = account.buy_shares('AAPL', 2.0)
+    assert transaction.quantity == 2
+    assert type(account.holdings['AAPL']) is int
+
+# Sell shares
+
+@pytest.fixture
+def account_for_selling(account):
+    """A fresh account that has bought 5 AAPL at the 150.0 demo price."""
+    account.buy_shares('AAPL', 5)  # Cost 750, balance 250
+    return account
+
+def test_sell_shares_positive_sufficient(account_for_selling):
+    """Test sell_shares with positive quantity and sufficient shares."""
+    account = account_for_selling
+    transaction = account.sell_shares('AAPL', 2)
+    assert account.balance == 250.0 + (150.0 * 2)  # 550.0
+    assert account.holdings['AAPL'] == 3
+    assert len(account.holdings) == 1
+    assert len(account.transactions) == 3  # Initial deposit, buy, sell
+    assert account.transactions[-1].type == accounts.SELL
+    assert account.transactions[-1].amount == 300.0
+    assert account.transactions[-1].symbol == 'AAPL'
+    assert account.transactions[-1].quantity == 2
+    assert account.transactions[-1].price == 150.0
+    assert transaction is account.transactions[-1]
+
+def test_sell_shares_all_shares(account_for_selling):
+    """Test selling all shares removes symbol from holdings."""
+    account = account_for_selling
+    account.sell_shares('AAPL', 5)
+    assert account.balance == 1000.0  # Back to initial
+    assert not account.holdings
+
+def test_sell_shares_multiple_symbols(set_price):
+    """Test selling shares from multiple symbols."""
+    account = Account(2000.0)
+    set_price(MIXED_PRICES.__getitem__)
+    # Buy AAPL and TSLA
+    account.buy_shares('AAPL', 5)  # Cost 750
+    account.buy_shares('TSLA', 2)  # Cost 500
+    # Now sell some
+    account.sell_shares('AAPL', 2)
+    account.sell_shares('TSLA', 1)
+    assert account.holdings == {'AAPL': 3, 'TSLA': 1}
+
+@pytest.mark.parametrize("symbol, bad_quantity", [
+    ('AAPL', 0),
+    ('AAPL', -1),
+    ('AAPL', 10),  # Only have 5
+    ('AAPL', 1.5),  # Not a whole number
+    ('TSLA', 1),  # Not in holdings
+])
+def test_sell_shares_rejects_invalid_quantity(account_with_shares, symbol, bad_quantity, set_price):
+    """Test sell_shares with zero, negative, fractional, excess or unheld quantity raises ValueError."""
+    set_price(MIXED_PRICES.__getitem__)
+    with pytest.raises(ValueError):
+        account_with_shares.sell_shares(symbol, bad_quantity)
+
+# Portfolio value and profit/loss
+
+def test_calculate_portfolio_value_cash_only(shared_account, set_price):
+    """Test portfolio value with only cash."""
+    set_price(150.0)
+    assert shared_account.calculate_portfolio_value() == 1000.0
+
+def test_calculate_portfolio_value_with_holdings(account, set_price):
+    """Test portfolio value with cash and holdings."""
+    set_price(MIXED_PRICES.__getitem__)
+    account.buy_shares('AAPL', 2)  # Cost 300, balance 700
+    account.buy_shares('TSLA', 1)  # Cost 250, balance 450
+    # Portfolio value = cash 450 + AAPL 2*150=300 + TSLA 1*250=250 = 1000
+    assert account.calculate_portfolio_value() == 1000.0
+
+def test_portfolio_value_ignores_price_order(account, set_price, monkeypatch):
+    """Test valuations match prices to holdings by symbol, whatever order the batch lookup returns."""
+    set_price(MIXED_PRICES.__getitem__)
+    account.buy_shares('AAPL', 2)  # Cost 300, balance 700
+    account.buy_shares('TSLA', 1)  # Cost 250, balance 450
+    monkeypatch.setattr(accounts, 'get_share_prices', lambda symbols: dict(reversed(MIXED_PRICES.items())))
+    assert account.calculate_portfolio_value() == 1000.0
+    assert account.calculate_profit_or_loss_at_time(float('inf')) == 0.0
+
+def test_calculate_portfolio_value_after_deposit(account, default_price):
+    """Test portfolio value is recomputed after the account changes."""
+    assert account.calculate_portfolio_value() == 1000.0
+    account.deposit(500.0)
+    assert account.calculate_portfolio_value() == 1500.0
+
+def test_mark_to_market(account, set_price):
+    """Test mark_to_market revalues holdings at the current price."""
+    set_price(100.0)
+    account.buy_shares('AAPL', 5)  # Cost 500, balance 500
+    assert account.calculate_portfolio_value() == 1000.0
+    set_price(150.0)
+    # Portfolio value = cash 500 + holdings 5*150=750 = 1250
+    assert account.mark_to_market() == 1250.0
+    assert account.calculate_portfolio_value() == 1250.0
+
+def test_calculate_profit_or_loss_no_trades(shared_account, set_price):
+    """Test profit/loss with no trades (should be zero)."""
+    set_price(150.0)
+    assert shared_account.calculate_profit_or_loss() == 0.0
+
+def test_calculate_profit_or_loss_profit(account, set_price):
+    """Test profit/loss with profit scenario."""
+    # Simulate buying low, price increases
+    set_price(100.0)  # Lower price for buying
+    account.buy_shares('AAPL', 5)  # Cost 500, balance 500
+    set_price(150.0)  # Price increases for valuation
+    # Portfolio value = cash 500 + holdings 5*150=750 = 1250
+    # Profit = 1250 - 1000 = 250
+    assert account.calculate_profit_or_loss() == 250.0
+
+def test_calculate_profit_or_loss_loss(account, set_price):
+    """Test profit/loss with loss scenario."""
+    # Simulate buying high, price decreases
+    set_price(200.0)  # Higher price for buying
+    account.buy_shares('AAPL', 5)  # Cost 1000, balance 0
+    set_price(150.0)  # Price decreases for valuation
+    # Portfolio value = cash 0 + holdings 5*150=750 = 750
+    # Profit = 750 - 1000 = -250 (loss)
+    assert account.calculate_profit_or_loss() == -250.0
+
+# List methods
+
+def test_list_holdings(account, default_price):
+    """Test list_holdings returns a read-only view."""
+    account.buy_shares('AAPL', 2)
+    holdings = account.list_holdings()
+    assert holdings == {'AAPL': 2}
+    # The view cannot be modified
+    with pytest.raises(TypeError):
         holdings['AAPL'] = 5
-        self.assertEqual(self.account.holdings, {'AAPL': 2})
-    
-    @patch('accounts.get_share_price')
-    def test_list_transactions(self, mock_get_price):
-        """Test list_transactions returns a copy."""
-        mock_get_price.return_value = 150.0
-        self.account.buy_shares('AAPL', 2)
-        transactions = self.account.list_transactions()
-        self.assertEqual(len(transactions), 2)
-        # Modify the copy, original should not change
-        transactions.append({'test': 'data'})
-        self.assertEqual(len(self.account.transactions), 2)
-
-class TestAccountProfitOrLossAtTime(unittest.TestCase):
-    def setUp(self):
-        self.account = accounts.Account(1000.0)
-        # Record initial timestamp
-        self.initial_time = time.time()
-        # Small delay to ensure different timestamps
-        time.sleep(0.01)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_profit_or_loss_at_time_initial(self, mock_get_price):
-        """Test profit/loss at initial time (should be zero)."""
-        mock_get_price.return_value = 150.0
-        profit_loss = self.account.calculate_profit_or_loss_at_time(self.initial_time)
-        self.assertEqual(profit_loss, 0.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_profit_or_loss_at_time_after_buy(self, mock_get_price):
-        """Test profit/loss at time after buying shares."""
-        mock_get_price.return_value = 150.0
-        # Buy shares at current time
-        self.account.buy_shares('AAPL', 2)  # Cost 300
-        buy_time = time.time()
-        time.sleep(0.01)
-        
-        # Calculate profit/loss at buy time
-        profit_loss = self.account.calculate_profit_or_loss_at_time(buy_time)
-        # At buy time: cash 700, holdings 2*150=300, total 1000, initial 1000 => profit 0
-        self.assertEqual(profit_loss, 0.0)
-    
-    @patch('accounts.get_share_price')
-    def test_calculate_profit_or_loss_at_time_between_transactions(self, mock_get_price):
-        """Test profit/loss at time between transactions."""
-        mock_get_price.return_value = 150.0
-        # First buy
-        self.account.buy_shares('AAPL', 2)  # Cost 300
-        time_between = time.time()
-        time.sleep(0.01)
-        # Second buy
-        self.account.buy_shares('AAPL', 1)  # Cost 150
-        
-        # Calculate profit/loss at time between buys
-        profit_loss = self.account.calculate_profit_or_loss_at_time(time_between)
-        # At time_between: only first buy happened
-        # Cash: 1000 - 300 = 700
-        # Holdings: 2 * 150 = 300
-        # Total: 1000, initial 1000 => profit 0
-        self.assertEqual(profit_loss, 0.0)
-    
-    @patch('accounts.get_
\ No newline at end of file
+    assert account.holdings['AAPL'] == 2
+    assert len(account.holdings) == 1
+    # The view reflects later trades
+    account.buy_shares('AAPL', 1)
+    assert holdings == {'AAPL': 3}
+
+def test_list_holding_values(account, default_price):
+    """Test list_holding_values returns the price and value of each holding."""
+    account.buy_shares('AAPL', 2)
+    assert account.list_holding_values() == {'AAPL': (150.0, 300.0)}
+
+def test_list_transactions(account, default_price):
+    """Test list_transactions returns a copy."""
+    account.buy_shares('AAPL', 2)
+    transactions = account.list_transactions()
+    assert len(transactions) == 2
+    # Modify the copy, original should not change
+    transactions.clear()
+    assert len(account.transactions) == 2
+
+def test_iter_transactions(account, default_price):
+    """Test iter_transactions yields every transaction in order."""
+    account.buy_shares('AAPL', 2)
+    assert list(account.iter_transactions()) == account.transactions
+
+def test_transaction_timestamps_ordered(account):
+    """Test back-to-back transactions on the real clock are ordered without sleeping."""
+    for amount in range(1, 6):
+        account.deposit(float(amount))
+    timestamps = [t.timestamp for t in account.transactions]
+    assert timestamps == sorted(timestamps)
+    # A reading taken after the last deposit sees every transaction
+    assert account.calculate_profit_or_loss_at_time(time.time()) == 15.0
+
+def test_list_transactions_paged_out(account, monkeypatch):
+    """Test transactions beyond the in-memory window are still listed."""
+    monkeypatch.setattr(accounts, '_PAGE_SIZE', 5)
+    monkeypatch.setattr(accounts, '_TRANSACTION_WINDOW', 10)
+    for amount in range(1, 26):
+        account.deposit(float(amount))
+    assert len(account.transactions) <= 10
+    amounts = [1000.0] + [float(amount) for amount in range(1, 26)]
+    assert [t.amount for t in account.list_transactions()] == amounts
+    assert [t.amount for t in account.iter_transactions()] == amounts
+    assert account.calculate_profit_or_loss_at_time(time.time()) == sum(amounts) - 1000.0
+
+def test_iter_transactions_paged_out_concurrently(account, monkeypatch):
+    """Test iterators over a paged account do not disturb each other or miss records paged out mid-way."""
+    monkeypatch.setattr(accounts, '_PAGE_SIZE', 5)
+    monkeypatch.setattr(accounts, '_TRANSACTION_WINDOW', 10)
+    for amount in range(1, 26):
+        account.deposit(float(amount))
+    expected = account.list_transactions()
+    assert [a for a, b in zip(account.iter_transactions(), account.iter_transactions())] == expected
+    
+    transactions = account.iter_transactions()
+    seen = [next(transactions) for _ in range(len(expected) - 3)]
+    for amount in range(26, 36):
+        account.deposit(float(amount))
+    seen.extend(transactions)
+    assert seen == account.list_transactions()
+
+def test_copy_paged_account(account, monkeypatch):
+    """Test a paged account can be deep-copied and pickled with its full history."""
+    monkeypatch.setattr(accounts, '_PAGE_SIZE', 5)
+    monkeypatch.setattr(accounts, '_TRANSACTION_WINDOW', 10)
+    for amount in range(1, 26):
+        account.deposit(float(amount))
+    for clone in (copy.deepcopy(account), pickle.loads(pickle.dumps(account))):
+        assert clone.list_transactions() == account.list_transactions()
+        assert len(clone.transactions) <= 10
+        assert clone.calculate_profit_or_loss_at_time(float('inf')) == account.calculate_profit_or_loss()
+
+# Profit/loss at a point in time
+
+def test_profit_or_loss_at_time_after_paging(monkeypatch):
+    """Test snapshots stay aligned with the full history once records are paged out."""
+    monkeypatch.setattr(accounts, '_SNAPSHOT_INTERVAL', 4)
+    monkeypatch.setattr(accounts, '_PAGE_SIZE', 6)
+    monkeypatch.setattr(accounts, '_TRANSACTION_WINDOW', 12)
+    account = Account(5000.0)
+    for _ in range(20):
+        account.deposit(1.0)
+        account.buy_shares('AAPL', 1)
+    assert account.calculate_profit_or_loss_at_time(time.time()) == account.calculate_profit_or_loss()
+
+# Wall-clock time reported to accounts opened under the injected clock
+WALL_EPOCH = 1_700_000_000.0
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive the account's clock from a counter that advances one second per reading,
+    so timestamps are strictly ordered without sleeping. The first reading is 0."""
+    counter = itertools.count(0, 10**9)
+    monkeypatch.setattr(accounts, '_wall_time', lambda: WALL_EPOCH)
+    monkeypatch.setattr(accounts, '_monotonic_ns', counter.__next__)
+    return counter
+
+@pytest.fixture
+def timed_account(clock, default_price):
+    """A fresh account opened at the first reading of the injected clock."""
+    return Account(1000.0)
+
+def now(clock):
+    """Read the injected clock as a UNIX timestamp, as seen by an account opened at its first reading."""
+    return WALL_EPOCH + next(clock) / 1e9
+
+def test_accounts_anchor_their_own_clock(clock, monkeypatch):
+    """Test each account converts transaction times from the wall clock at its own opening."""
+    first = Account(1000.0)
+    monkeypatch.setattr(accounts, '_wall_time', lambda: WALL_EPOCH + 3600.0)
+    second = Account(1000.0)
+    assert first.transactions[0].timestamp == WALL_EPOCH + 1.0
+    assert second.transactions[0].timestamp == WALL_EPOCH + 3600.0 + 1.0
+    assert second.calculate_profit_or_loss_at_time(WALL_EPOCH + 3600.5) == -1000.0
+    assert second.calculate_profit_or_loss_at_time(WALL_EPOCH + 3601.0) == 0.0
+
+def test_calculate_profit_or_loss_at_time_initial(timed_account, clock):
+    """Test profit/loss at initial time (should be zero)."""
+    initial_time = now(clock)
+    profit_loss = timed_account.calculate_profit_or_loss_at_time(initial_time)
+    assert profit_loss == 0.0
+
+def test_calculate_profit_or_loss_at_time_after_buy(timed_account, clock):
+    """Test profit/loss at time after buying shares."""
+    # Buy shares at current time
+    timed_account.buy_shares('AAPL', 2)  # Cost 300
+    buy_time = now(clock)
+
+    # Calculate profit/loss at buy time
+    profit_loss = timed_account.calculate_profit_or_loss_at_time(buy_time)
+    # At buy time: cash 700, holdings 2*150=300, total 1000, initial 1000 => profit 0
+    assert profit_loss == 0.0
+
+def test_calculate_profit_or_loss_at_time_between_transactions(timed_account, clock):
+    """Test profit/loss at time between transactions."""
+    # First buy
+    timed_account.buy_shares('AAPL', 2)  # Cost 300
+    time_between = now(clock)
+    # Second buy
+    timed_account.buy_shares('AAPL', 1)  # Cost 150
+
+    # Calculate profit/loss at time between buys
+    profit_loss = timed_account.calculate_profit_or_loss_at_time(time_between)
+    # At time_between: only first buy happened
+    # Cash: 1000 - 300 = 700
+    # Holdings: 2 * 150 = 300
+    # Total: 1000, initial 1000 => profit 0
+    assert profit_loss == 0.0
+
+def test_calculate_profit_or_loss_at_time_from_snapshot(timed_account, clock):
+    """Test profit/loss at time over a history long enough to use snapshots."""
+    for _ in range(2 * accounts._SNAPSHOT_INTERVAL + 10):
+        timed_account.deposit(1.0)
+    midpoint = timed_account.transactions[accounts._SNAPSHOT_INTERVAL + 50].timestamp
+    expected = sum(t.amount for t in timed_account.transactions if t.timestamp <= midpoint) - 1000.0
+    assert timed_account.calculate_profit_or_loss_at_time(midpoint) == expected
+    assert timed_account.calculate_profit_or_loss_at_time(now(clock)) == timed_account.calculate_profit_or_loss()
+
+def test_calculate_profit_or_loss_at_time_infinite(timed_account):
+    """Test infinite timestamps cover the whole history or none of it."""
+    timed_account.buy_shares('AAPL', 2)
+    timed_account.deposit(100.0)
+    assert timed_account.calculate_profit_or_loss_at_time(float('inf')) == timed_account.calculate_profit_or_loss()
+    assert timed_account.calculate_profit_or_loss_at_time(float('-inf')) == -1000.0
+
+def test_calculate_profit_or_loss_at_time_nan(timed_account):
+    """Test a NaN timestamp raises ValueError."""
+    with pytest.raises(ValueError):
+        timed_account.calculate_profit_or_loss_at_time(float('nan'))